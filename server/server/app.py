@@ -5,18 +5,53 @@ Implements MQTT_API_SPECIFICATION.md and OTA_SERVER_ARCHITECTURE.md
 """
 
 from flask import Flask, jsonify, request, send_file, Response
+from flask.json.provider import DefaultJSONProvider
 import os
+import io
+import re
 import json
 import hashlib
+import hmac
+import itertools
+import secrets
 import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from mqtt_broker import OTAMQTTBroker, example_handlers
 from werkzeug.utils import secure_filename
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (C encoder/decoder)"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
 
+# Use orjson for jsonify()/request.get_json() when available
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
 # ==================== Configuration ====================
 
 # Directories
@@ -34,9 +69,58 @@ SERVER_URL = os.getenv('SERVER_URL', 'https://ota-cdn.oem-server.com')
 MQTT_BROKER_HOST = os.getenv('MQTT_BROKER_HOST', 'localhost')
 MQTT_BROKER_PORT = int(os.getenv('MQTT_BROKER_PORT', '1883'))
 
+# Package download offload: when enabled, the reverse proxy (nginx) serves
+# package bytes via X-Accel-Redirect from an internal location that maps
+# XACCEL_PREFIX to CAMPAIGNS_DIR
+USE_XACCEL = os.getenv('USE_XACCEL', '').lower() in ('1', 'true', 'yes')
+XACCEL_PREFIX = os.getenv('XACCEL_PREFIX', '/internal/packages')
+
+# Maximum number of package downloads served at once (excess gets 503).
+# A streaming download holds a gunicorn gthread thread until it finishes, so
+# the default leaves a quarter of GUNICORN_THREADS free for API requests.
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', '16'))
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv(
+    'MAX_CONCURRENT_DOWNLOADS', str(max(1, GUNICORN_THREADS - max(1, GUNICORN_THREADS // 4)))
+))
+if MAX_CONCURRENT_DOWNLOADS >= GUNICORN_THREADS:
+    print(f"[Config] MAX_CONCURRENT_DOWNLOADS={MAX_CONCURRENT_DOWNLOADS} >= "
+          f"GUNICORN_THREADS={GUNICORN_THREADS}: downloads can starve API requests")
+
+# Download bearer tokens are signed, not stored, so any worker or a restarted
+# server can verify them. Set DOWNLOAD_TOKEN_SECRET in production; without it
+# each process start picks a random key and earlier tokens stop validating.
+DOWNLOAD_TOKEN_TTL_SEC = 3600
+DOWNLOAD_TOKEN_SECRET = os.getenv('DOWNLOAD_TOKEN_SECRET', '').encode('utf-8')
+if not DOWNLOAD_TOKEN_SECRET:
+    print("[Config] DOWNLOAD_TOKEN_SECRET not set, download tokens will not survive a restart")
+    DOWNLOAD_TOKEN_SECRET = secrets.token_bytes(32)
+
+# Maximum number of sub-requests accepted by /api/batch
+MAX_BATCH_REQUESTS = int(os.getenv('MAX_BATCH_REQUESTS', '50'))
+
+# Worker threads used to read campaign metadata at startup
+CAMPAIGN_LOAD_WORKERS = int(os.getenv('CAMPAIGN_LOAD_WORKERS', '16'))
+
+# Package digest published in campaign metadata: 'sha256' (sha256 + md5 fields)
+# or 'blake3' (single blake3 field; vehicles must verify BLAKE3)
+PACKAGE_DIGEST_FIELDS = {
+    'sha256': ('sha256', 'md5'),
+    'blake3': ('blake3',),
+}
+HASH_ALGO = os.getenv('HASH_ALGO', 'sha256').lower()
+if HASH_ALGO not in PACKAGE_DIGEST_FIELDS:
+    print(f"[Config] Unknown HASH_ALGO={HASH_ALGO!r} "
+          f"(expected one of {', '.join(PACKAGE_DIGEST_FIELDS)}), using sha256")
+    HASH_ALGO = 'sha256'
+elif HASH_ALGO == 'blake3' and blake3 is None:
+    print("[Config] HASH_ALGO=blake3 but blake3 is not installed, using sha256")
+    HASH_ALGO = 'sha256'
+
 # ==================== Global State ====================
 
-# Campaign database (in production, use PostgreSQL/MongoDB)
+# Campaign database (in production, use PostgreSQL/MongoDB).
+# Shared by Flask and MQTT dispatcher threads: single get/set/setdefault calls
+# are atomic under the GIL; list endpoints serialise snapshot_records() copies.
 campaigns_db: Dict[str, Dict] = {}
 
 # Vehicle database
@@ -45,18 +129,80 @@ vehicles_db: Dict[str, Dict] = {}
 # MQTT Broker
 mqtt_broker: Optional[OTAMQTTBroker] = None
 
+# Package hash cache: path -> ((mtime_ns, size), ({field: hexdigest}, size))
+package_hash_cache: Dict[str, Tuple[Tuple[int, int], Tuple[Dict[str, str], int]]] = {}
+
+# Download admission control
+download_slots = threading.BoundedSemaphore(MAX_CONCURRENT_DOWNLOADS)
+
+# Download session sequence (combined with a random suffix for uniqueness)
+_session_seq = itertools.count(1)
+
+# Coarse wall-clock cache: (monotonic expiry, ISO timestamp)
+NOW_ISO_TTL_SEC = 0.1
+_now_iso_cache = (0.0, '')
+
+
+def now_iso() -> str:
+    """Current time as ISO string, refreshed at most every NOW_ISO_TTL_SEC"""
+    global _now_iso_cache
+    expires, value = _now_iso_cache
+    now = time.monotonic()
+    if now >= expires:
+        value = datetime.now().isoformat()
+        _now_iso_cache = (now + NOW_ISO_TTL_SEC, value)
+    return value
+
+
+def snapshot_records(db: Dict[str, Dict]) -> List[Dict]:
+    """Shallow copies of all records (the live dict is never iterated)"""
+    return [record.copy() for record in list(db.values())]
+
+
+def _download_token_mac(vin: str, campaign_id: str, expiry: int) -> str:
+    """HMAC-SHA256 binding a download token to vehicle, campaign and expiry"""
+    message = f'{vin}\n{campaign_id}\n{expiry}'.encode('utf-8')
+    return hmac.new(DOWNLOAD_TOKEN_SECRET, message, hashlib.sha256).hexdigest()
+
+
+def issue_download_token(vin: str, campaign_id: str) -> str:
+    """Signed bearer token "<vin>.<expiry>.<mac>" for one vehicle/campaign download"""
+    expiry = int(time.time()) + DOWNLOAD_TOKEN_TTL_SEC
+    return f'{vin}.{expiry}.{_download_token_mac(vin, campaign_id, expiry)}'
+
+
+def validate_download_token(token: str, campaign_id: str) -> Optional[str]:
+    """VIN the token was issued to, or None if forged, expired or for another campaign"""
+    try:
+        vin, expiry, mac = token.rsplit('.', 2)
+        expiry = int(expiry)
+    except ValueError:
+        return None
+    
+    if expiry < time.time():
+        return None
+    
+    expected = _download_token_mac(vin, campaign_id, expiry)
+    if not hmac.compare_digest(mac.encode('utf-8', 'replace'), expected.encode('utf-8')):
+        return None
+    return vin
+
 
 # ==================== Campaign Management ====================
 
 class CampaignManager:
     """OTA Campaign Manager"""
     
+    # Deployment metadata shared by all vehicles:
+    # campaign_id -> ((mtime_ns, size) of full_package.bin or None, template)
+    _metadata_templates: Dict[str, Tuple[Optional[Tuple[int, int]], Dict]] = {}
+    
     @staticmethod
-    def create_campaign(campaign_id: str, campaign_data: Dict) -> Dict:
-        """Create new OTA campaign"""
+    def create_campaign(campaign_id: str, campaign_data: Dict) -> Optional[Dict]:
+        """Create new OTA campaign (None if campaign_id is already taken)"""
         campaign = {
             'campaign_id': campaign_id,
-            'created_at': datetime.now().isoformat(),
+            'created_at': now_iso(),
             'status': 'created',
             'target_ecus': campaign_data.get('target_ecus', []),
             'total_size_mb': campaign_data.get('total_size_mb', 0),
@@ -68,7 +214,11 @@ class CampaignManager:
             'deployment_status': {}
         }
         
-        campaigns_db[campaign_id] = campaign
+        # Atomic check-and-insert: concurrent creates of one id cannot both win
+        if campaigns_db.setdefault(campaign_id, campaign) is not campaign:
+            return None
+        
+        CampaignManager.invalidate_metadata_template(campaign_id)
         return campaign
     
     @staticmethod
@@ -79,23 +229,80 @@ class CampaignManager:
     @staticmethod
     def list_campaigns() -> List[Dict]:
         """List all campaigns"""
-        return list(campaigns_db.values())
+        return snapshot_records(campaigns_db)
     
     @staticmethod
-    def get_campaign_package_path(campaign_id: str) -> Optional[str]:
-        """Get path to campaign full package"""
-        campaign = campaigns_db.get(campaign_id)
-        if not campaign:
-            return None
+    def stat_campaign_package(campaign: Dict) -> Tuple[str, Optional[os.stat_result]]:
+        """Path to the campaign's full_package.bin and its stat (None if missing)"""
+        package_path = os.path.join(campaign['campaign_dir'], 'full_package.bin')
+        try:
+            return package_path, os.stat(package_path)
+        except OSError:
+            return package_path, None
+    
+    @staticmethod
+    def get_metadata_template(campaign_id: str, campaign: Dict) -> Dict:
+        """Vehicle-independent deployment metadata, rebuilt when the package changes"""
+        # One stat per send; hashes are only looked up when the package changed
+        package_path, st = CampaignManager.stat_campaign_package(campaign)
+        package_key = (st.st_mtime_ns, st.st_size) if st else None
         
-        # Look for full_package.bin in campaign directory
-        campaign_dir = campaign['campaign_dir']
-        full_package_path = os.path.join(campaign_dir, 'full_package.bin')
+        cached = CampaignManager._metadata_templates.get(campaign_id)
+        if cached and cached[0] == package_key:
+            return cached[1]
         
-        if os.path.exists(full_package_path):
-            return full_package_path
+        if package_key:
+            digests, total_size = get_package_hashes(package_path)
+        else:
+            digests = {field: "unknown" for field in PACKAGE_DIGEST_FIELDS[HASH_ALGO]}
+            total_size = campaign.get('total_size_mb', 0) * 1024 * 1024
         
-        return None
+        template = {
+            'campaign_id': campaign_id,
+            'download_session': {
+                'session_id': None,
+                'method': 'https',
+                'protocol': 'HTTPS/1.1',
+                'transport': 'Hybrid PQC-TLS 1.3',
+                'cipher_suite': 'TLS_MLKEM768_X25519_WITH_AES_256_GCM_SHA384',
+                'compression': 'none',
+                'server_url': SERVER_URL,
+                'download_endpoint': f'/packages/{campaign_id}/full_package.bin',
+                'authentication': {
+                    'type': 'bearer_token',
+                    'token_expiry_sec': DOWNLOAD_TOKEN_TTL_SEC,
+                    'token': None
+                },
+                'resume_supported': True,
+                'partial_download_supported': True
+            },
+            'full_package': {
+                'package_url': f"{SERVER_URL}/packages/{campaign_id}/full_package.bin",
+                'package_id': f"full-ota-{campaign_id}",
+                'total_size_bytes': total_size,
+                **digests,
+                'signature': {
+                    'algorithm': 'RSA-2048-SHA256',
+                    'public_key_id': 'oem-signing-key-2025',
+                    'signature_base64': 'BASE64_SIGNATURE...'
+                }
+            },
+            'packages': campaign.get('packages', []),
+            'installation_sequence': [pkg['package_id'] for pkg in campaign.get('packages', [])],
+            'rollback_data': {
+                'rollback_enabled': campaign.get('rollback_enabled', True),
+                'rollback_timeout_sec': 300,
+                'auto_rollback_on_failure': True
+            }
+        }
+        
+        CampaignManager._metadata_templates[campaign_id] = (package_key, template)
+        return template
+    
+    @staticmethod
+    def invalidate_metadata_template(campaign_id: str):
+        """Drop cached deployment metadata after a campaign is (re)defined"""
+        CampaignManager._metadata_templates.pop(campaign_id, None)
     
     @staticmethod
     def deploy_campaign_to_vehicle(campaign_id: str, vin: str) -> bool:
@@ -116,7 +323,7 @@ class CampaignManager:
         
         campaign['deployment_status'][vin] = {
             'status': 'notified',
-            'notified_at': datetime.now().isoformat()
+            'notified_at': now_iso()
         }
         
         return True
@@ -134,7 +341,7 @@ def setup_mqtt_handlers():
         # Update vehicle database
         vehicles_db[vin] = {
             'vin': vin,
-            'last_wake_up': datetime.now().isoformat(),
+            'last_wake_up': now_iso(),
             'vmg_info': payload.get('vmg_info', {}),
             'vehicle_state': payload.get('vehicle_state', {}),
             'status': 'online'
@@ -148,17 +355,19 @@ def setup_mqtt_handlers():
         """Handle VCI report"""
         print(f"[{vin}] VCI Report received")
         
-        if vin in vehicles_db:
-            vehicles_db[vin]['vci'] = payload
-            vehicles_db[vin]['last_vci_update'] = datetime.now().isoformat()
+        vehicle = vehicles_db.get(vin)
+        if vehicle:
+            vehicle['vci'] = payload
+            vehicle['last_vci_update'] = now_iso()
     
     def on_ota_readiness_response(vin: str, payload: Dict):
         """Handle OTA readiness response"""
         status = payload.get('overall_status', 'unknown')
         print(f"[{vin}] OTA Readiness: {status}")
         
-        if vin in vehicles_db:
-            vehicles_db[vin]['ota_readiness'] = payload
+        vehicle = vehicles_db.get(vin)
+        if vehicle:
+            vehicle['ota_readiness'] = payload
     
     def on_campaign_response(vin: str, payload: Dict):
         """Handle campaign acceptance/rejection"""
@@ -167,13 +376,13 @@ def setup_mqtt_handlers():
         
         print(f"[{vin}] Campaign {campaign_id} response: {status}")
         
-        if campaign_id in campaigns_db:
-            campaign = campaigns_db[campaign_id]
+        campaign = campaigns_db.get(campaign_id)
+        if campaign:
             if 'deployment_status' not in campaign:
                 campaign['deployment_status'] = {}
             
             campaign['deployment_status'][vin]['status'] = status
-            campaign['deployment_status'][vin]['response_at'] = datetime.now().isoformat()
+            campaign['deployment_status'][vin]['response_at'] = now_iso()
             
             # If accepted, send metadata with download URL
             if status == 'accepted' and mqtt_broker:
@@ -194,11 +403,11 @@ def setup_mqtt_handlers():
         
         print(f"[{vin}] Download complete: {status}")
         
-        if campaign_id in campaigns_db:
-            campaign = campaigns_db[campaign_id]
+        campaign = campaigns_db.get(campaign_id)
+        if campaign:
             if 'deployment_status' in campaign and vin in campaign['deployment_status']:
                 campaign['deployment_status'][vin]['download_status'] = status
-                campaign['deployment_status'][vin]['download_complete_at'] = datetime.now().isoformat()
+                campaign['deployment_status'][vin]['download_complete_at'] = now_iso()
     
     def on_installation_complete(vin: str, payload: Dict):
         """Handle installation complete"""
@@ -207,11 +416,11 @@ def setup_mqtt_handlers():
         
         print(f"[{vin}] Installation complete: {overall_status}")
         
-        if campaign_id in campaigns_db:
-            campaign = campaigns_db[campaign_id]
+        campaign = campaigns_db.get(campaign_id)
+        if campaign:
             if 'deployment_status' in campaign and vin in campaign['deployment_status']:
                 campaign['deployment_status'][vin]['installation_status'] = overall_status
-                campaign['deployment_status'][vin]['installation_complete_at'] = datetime.now().isoformat()
+                campaign['deployment_status'][vin]['installation_complete_at'] = now_iso()
     
     def on_verification_complete(vin: str, payload: Dict):
         """Handle verification complete"""
@@ -220,11 +429,11 @@ def setup_mqtt_handlers():
         
         print(f"[{vin}] Verification complete: {verification_status}")
         
-        if campaign_id in campaigns_db:
-            campaign = campaigns_db[campaign_id]
+        campaign = campaigns_db.get(campaign_id)
+        if campaign:
             if 'deployment_status' in campaign and vin in campaign['deployment_status']:
                 campaign['deployment_status'][vin]['verification_status'] = verification_status
-                campaign['deployment_status'][vin]['verification_complete_at'] = datetime.now().isoformat()
+                campaign['deployment_status'][vin]['verification_complete_at'] = now_iso()
                 campaign['deployment_status'][vin]['status'] = 'completed'
     
     def on_ota_error(vin: str, payload: Dict):
@@ -234,8 +443,8 @@ def setup_mqtt_handlers():
         
         print(f"[{vin}] OTA Error: {error.get('message', 'Unknown error')}")
         
-        if campaign_id in campaigns_db:
-            campaign = campaigns_db[campaign_id]
+        campaign = campaigns_db.get(campaign_id)
+        if campaign:
             if 'deployment_status' in campaign and vin in campaign['deployment_status']:
                 campaign['deployment_status'][vin]['error'] = error
                 campaign['deployment_status'][vin]['status'] = 'error'
@@ -257,67 +466,61 @@ def setup_mqtt_handlers():
         mqtt_broker.register_handler(msg_type, handler)
 
 
+# Read size used when hashing packages
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _new_package_hashers() -> Dict:
+    """Fresh hasher objects for the configured HASH_ALGO"""
+    if HASH_ALGO == 'blake3':
+        return {'blake3': blake3.blake3(max_threads=blake3.blake3.AUTO)}
+    return {'sha256': hashlib.sha256(), 'md5': hashlib.md5()}
+
+
+def calculate_package_hashes(package_path: str) -> Tuple[Dict[str, str], int]:
+    """Compute ({field: hexdigest}, size) of a package in a single streaming pass"""
+    hashers = _new_package_hashers()
+    updates = [h.update for h in hashers.values()]
+    total_size = 0
+    
+    with open(package_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            for update in updates:
+                update(chunk)
+            total_size += len(chunk)
+    
+    return {field: h.hexdigest() for field, h in hashers.items()}, total_size
+
+
+def get_package_hashes(package_path: str) -> Tuple[Dict[str, str], int]:
+    """Package hashes, recomputed only when the file's mtime or size changes"""
+    st = os.stat(package_path)
+    key = (st.st_mtime_ns, st.st_size)
+    
+    cached = package_hash_cache.get(package_path)
+    if cached and cached[0] == key:
+        return cached[1]
+    
+    hashes = calculate_package_hashes(package_path)
+    package_hash_cache[package_path] = (key, hashes)
+    return hashes
+
+
 def send_campaign_metadata_to_vehicle(campaign_id: str, vin: str):
     """Send campaign metadata with HTTPS download URL to vehicle"""
     campaign = campaigns_db.get(campaign_id)
     if not campaign or not mqtt_broker:
         return False
     
-    # Generate authentication token (in production, use JWT)
-    token = f"token_{vin}_{campaign_id}_{int(time.time())}"
-    
-    # Calculate package hash
-    package_path = CampaignManager.get_campaign_package_path(campaign_id)
-    if package_path and os.path.exists(package_path):
-        with open(package_path, 'rb') as f:
-            package_data = f.read()
-            sha256 = hashlib.sha256(package_data).hexdigest()
-            md5 = hashlib.md5(package_data).hexdigest()
-            total_size = len(package_data)
-    else:
-        sha256 = "unknown"
-        md5 = "unknown"
-        total_size = campaign.get('total_size_mb', 0) * 1024 * 1024
-    
-    metadata = {
-        'campaign_id': campaign_id,
-        'download_session': {
-            'session_id': f"dl-{int(time.time())}",
-            'method': 'https',
-            'protocol': 'HTTPS/1.1',
-            'transport': 'Hybrid PQC-TLS 1.3',
-            'cipher_suite': 'TLS_MLKEM768_X25519_WITH_AES_256_GCM_SHA384',
-            'compression': 'none',
-            'server_url': SERVER_URL,
-            'download_endpoint': f'/packages/{campaign_id}/full_package.bin',
-            'authentication': {
-                'type': 'bearer_token',
-                'token_expiry_sec': 3600,
-                'token': token
-            },
-            'resume_supported': True,
-            'partial_download_supported': True
-        },
-        'full_package': {
-            'package_url': f"{SERVER_URL}/packages/{campaign_id}/full_package.bin",
-            'package_id': f"full-ota-{campaign_id}",
-            'total_size_bytes': total_size,
-            'sha256': sha256,
-            'md5': md5,
-            'signature': {
-                'algorithm': 'RSA-2048-SHA256',
-                'public_key_id': 'oem-signing-key-2025',
-                'signature_base64': 'BASE64_SIGNATURE...'
-            }
-        },
-        'packages': campaign.get('packages', []),
-        'installation_sequence': [pkg['package_id'] for pkg in campaign.get('packages', [])],
-        'rollback_data': {
-            'rollback_enabled': campaign.get('rollback_enabled', True),
-            'rollback_timeout_sec': 300,
-            'auto_rollback_on_failure': True
-        }
-    }
+    # Signed authentication token (verified by download_campaign_package)
+    token = issue_download_token(vin, campaign_id)
+    
+    # Shallow-copy the shared template; only the download session differs per vehicle
+    template = CampaignManager.get_metadata_template(campaign_id, campaign)
+    metadata = template.copy()
+    session = metadata['download_session'] = template['download_session'].copy()
+    session['session_id'] = f"dl-{next(_session_seq):08x}-{secrets.token_hex(4)}"
+    session['authentication'] = {**session['authentication'], 'token': token}
     
     mqtt_broker.send_campaign_metadata(vin, metadata)
     return True
@@ -325,23 +528,29 @@ def send_campaign_metadata_to_vehicle(campaign_id: str, vin: str):
 
 # ==================== REST API Endpoints ====================
 
+# Static part of the index response (built once at import)
+SERVER_INFO = {
+    'server': 'PQC OTA Server - OEM Cloud',
+    'version': '1.0.0',
+    'architecture': 'Zonal E/E',
+    'security': {
+        'transport': 'Hybrid PQC-TLS 1.3',
+        'key_exchange': 'ML-KEM 768 + X25519',
+        'encryption': 'AES-256-GCM',
+        'hash': 'SHA-384'
+    },
+    'protocols': {
+        'mqtt': f'{MQTT_BROKER_HOST}:{MQTT_BROKER_PORT}',
+        'https': SERVER_URL
+    }
+}
+
+
 @app.route('/')
 def index():
     """Server information"""
     return jsonify({
-        'server': 'PQC OTA Server - OEM Cloud',
-        'version': '1.0.0',
-        'architecture': 'Zonal E/E',
-        'security': {
-            'transport': 'Hybrid PQC-TLS 1.3',
-            'key_exchange': 'ML-KEM 768 + X25519',
-            'encryption': 'AES-256-GCM',
-            'hash': 'SHA-384'
-        },
-        'protocols': {
-            'mqtt': f'{MQTT_BROKER_HOST}:{MQTT_BROKER_PORT}',
-            'https': SERVER_URL
-        },
+        **SERVER_INFO,
         'mqtt_connected': mqtt_broker.connected if mqtt_broker else False
     })
 
@@ -351,9 +560,9 @@ def health():
     """Health check"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso(),
         'campaigns_count': len(campaigns_db),
-        'vehicles_online': len(mqtt_broker.get_connected_vehicles()) if mqtt_broker else 0
+        'vehicles_online': mqtt_broker.connected_vehicle_count() if mqtt_broker else 0
     })
 
 
@@ -386,10 +595,10 @@ def create_campaign():
     if not campaign_id:
         return jsonify({'error': 'campaign_id required'}), 400
     
-    if campaign_id in campaigns_db:
+    campaign = CampaignManager.create_campaign(campaign_id, data)
+    if campaign is None:
         return jsonify({'error': 'Campaign already exists'}), 409
     
-    campaign = CampaignManager.create_campaign(campaign_id, data)
     return jsonify(campaign), 201
 
 
@@ -415,15 +624,16 @@ def deploy_campaign(campaign_id: str, vin: str):
 def list_vehicles():
     """List all vehicles"""
     return jsonify({
-        'vehicles': list(vehicles_db.values())
+        'vehicles': snapshot_records(vehicles_db)
     })
 
 
 @app.route('/api/vehicles/<vin>', methods=['GET'])
 def get_vehicle(vin: str):
     """Get vehicle details"""
-    if vin in vehicles_db:
-        return jsonify(vehicles_db[vin])
+    vehicle = vehicles_db.get(vin)
+    if vehicle:
+        return jsonify(vehicle)
     else:
         return jsonify({'error': 'Vehicle not found'}), 404
 
@@ -465,56 +675,226 @@ def check_ota_readiness(vin: str):
     })
 
 
+# ==================== Batch API ====================
+
+def _batch_error(sub_id, status: int, message: str) -> Dict:
+    """Per-item error entry for /api/batch"""
+    return {'id': sub_id, 'status': status, 'headers': {}, 'body': {'error': message}}
+
+
+@app.route('/api/batch', methods=['POST'])
+def batch_requests():
+    """Execute multiple API requests in a single round trip"""
+    data = request.get_json(silent=True)
+    sub_requests = data.get('requests') if isinstance(data, dict) else None
+    
+    if not isinstance(sub_requests, list):
+        return jsonify({'error': 'requests list required'}), 400
+    
+    if len(sub_requests) > MAX_BATCH_REQUESTS:
+        return jsonify({'error': f'At most {MAX_BATCH_REQUESTS} requests per batch'}), 413
+    
+    responses = []
+    for sub in sub_requests:
+        if not isinstance(sub, dict):
+            responses.append(_batch_error(None, 400, 'Batch item must be an object'))
+            continue
+        
+        sub_id = sub.get('id')
+        url = sub.get('url')
+        method = sub.get('method', 'GET')
+        headers = sub.get('headers')
+        
+        if not isinstance(url, str):
+            responses.append(_batch_error(sub_id, 400, 'Unsupported batch url'))
+            continue
+        
+        if not isinstance(method, str) or not (headers is None or isinstance(headers, dict)):
+            responses.append(_batch_error(sub_id, 400, 'Invalid batch method or headers'))
+            continue
+        
+        # One failing item must not turn the whole batch into a 500
+        try:
+            with app.test_request_context(
+                url,
+                method=method,
+                headers=headers,
+                json=sub.get('body')
+            ):
+                # Decide on the matched route, not the raw url (which may be
+                # percent-encoded): only JSON API routes, no nested batches
+                rule = request.url_rule
+                if rule and (not rule.rule.startswith('/api/')
+                             or rule.endpoint == 'batch_requests'):
+                    responses.append(_batch_error(sub_id, 400, 'Unsupported batch url'))
+                    continue
+
+                response = app.full_dispatch_request()
+        except Exception as e:
+            print(f"[Batch] Sub-request {sub_id!r} to {url} failed: {e}")
+            responses.append(_batch_error(sub_id, 500, f'Internal error: {type(e).__name__}'))
+            continue
+        
+        responses.append({
+            'id': sub_id,
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'body': response.get_json(silent=True)
+        })
+    
+    return jsonify({'responses': responses})
+
+
 # ==================== HTTPS Package Download API ====================
 
+# Chunk size for streaming partial package downloads
+RANGE_CHUNK_SIZE = 64 * 1024
+
+# Single byte range: "bytes=<first>-<last>" with either side optional
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+class DownloadSlotFile(io.FileIO):
+    """Package file that owns a download slot and frees it when closed"""
+    
+    _slot_held = False
+    
+    def __init__(self, path: str):
+        super().__init__(path, 'rb')
+        self._slot_held = True
+    
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._slot_held:
+                self._slot_held = False
+                download_slots.release()
+
+
+def iter_file_range(f, start: int, length: int):
+    """Yield `length` bytes of an open file starting at `start`, then close it"""
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        # direct_passthrough responses skip call_on_close; close here
+        f.close()
+
+
 @app.route('/packages/<campaign_id>/full_package.bin', methods=['GET'])
 def download_campaign_package(campaign_id: str):
     """Download full OTA package (with Range support for resume)"""
-    # Verify authentication token
-    auth_header = request.headers.get('Authorization')
+    headers = request.headers
+    auth_header = headers.get('Authorization')
+    range_header = headers.get('Range')
+    
+    # Verify authentication token; a vehicle that names itself must hold
+    # a token issued to that VIN
     if not auth_header or not auth_header.startswith('Bearer '):
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Get package path
-    package_path = CampaignManager.get_campaign_package_path(campaign_id)
-    if not package_path or not os.path.exists(package_path):
+    token_vin = validate_download_token(auth_header[7:].strip(), campaign_id)
+    vehicle_id = headers.get('X-Vehicle-Id')
+    if token_vin is None or (vehicle_id is not None and vehicle_id != token_vin):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Locate the package with a single stat (also yields its size)
+    campaign = campaigns_db.get(campaign_id)
+    if not campaign:
         return jsonify({'error': 'Package not found'}), 404
     
-    # Check if Range header is present (for resume support)
-    range_header = request.headers.get('Range')
+    package_path, package_stat = CampaignManager.stat_campaign_package(campaign)
+    if not package_stat:
+        return jsonify({'error': 'Package not found'}), 404
+    file_size = package_stat.st_size
     
+    # Let the reverse proxy send the file (it also handles Range itself)
+    if USE_XACCEL:
+        relative_path = os.path.relpath(package_path, CAMPAIGNS_DIR).replace(os.sep, '/')
+        response = Response(status=200, mimetype='application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f'{XACCEL_PREFIX}/{relative_path}'
+        response.headers['Content-Disposition'] = f'attachment; filename={campaign_id}_full_package.bin'
+        return response
+    
+    # Resumed ECU downloads carry a Range header (the common case)
     if range_header:
-        # Parse Range header (e.g., "bytes=0-1023")
-        try:
-            byte_range = range_header.replace('bytes=', '').split('-')
-            start = int(byte_range[0]) if byte_range[0] else 0
-            
-            file_size = os.path.getsize(package_path)
-            end = int(byte_range[1]) if byte_range[1] else file_size - 1
-            
-            # Read partial file
-            with open(package_path, 'rb') as f:
-                f.seek(start)
-                data = f.read(end - start + 1)
-            
-            # Return 206 Partial Content
-            response = Response(data, 206)
-            response.headers['Content-Range'] = f'bytes {start}-{end}/{file_size}'
-            response.headers['Content-Length'] = str(len(data))
-            response.headers['Accept-Ranges'] = 'bytes'
-            return response
+        # Parse Range header (e.g., "bytes=0-1023", "bytes=1024-", "bytes=-512")
+        match = RANGE_RE.fullmatch(range_header)
+        if not match:
+            return jsonify({'error': 'Invalid range request'}), 400
         
-        except Exception as e:
-            print(f"Range request error: {e}")
+        first, last = match.groups()
+        if not first and not last:
             return jsonify({'error': 'Invalid range request'}), 400
+        
+        if first:
+            start = int(first)
+            end = min(int(last), file_size - 1) if last else file_size - 1
+            if last and int(last) < start:
+                # last < first is syntactically invalid (RFC 7233 2.1):
+                # ignore the header and serve the full package
+                range_header = None
+        else:
+            # Suffix range: last N bytes
+            start = max(file_size - int(last), 0)
+            end = file_size - 1
+        
+        if range_header and start > end:
+            response = jsonify({'error': 'Range not satisfiable'})
+            response.headers['Content-Range'] = f'bytes */{file_size}'
+            return response, 416
+    
+    # Reject instead of queueing when all download slots are busy
+    if not download_slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many concurrent downloads'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    # The slot travels with the open file: the server closes the response
+    # body (generator or wsgi.file_wrapper), which closes the file and frees
+    # the slot. direct_passthrough bodies never run call_on_close callbacks.
+    try:
+        f = DownloadSlotFile(package_path)
+    except OSError:
+        download_slots.release()
+        return jsonify({'error': 'Package not found'}), 404
     
-    else:
-        # Full file download
-        return send_file(
-            package_path,
-            as_attachment=True,
-            download_name=f'{campaign_id}_full_package.bin'
-        )
+    try:
+        if range_header:
+            # Stream the partial file instead of buffering it
+            length = end - start + 1
+            response = Response(
+                iter_file_range(f, start, length),
+                206,
+                mimetype='application/octet-stream',
+                direct_passthrough=True
+            )
+            response.headers['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+            response.headers['Content-Length'] = str(length)
+            response.headers['Accept-Ranges'] = 'bytes'
+        
+        else:
+            # Full file download (the file object keeps wsgi.file_wrapper/sendfile)
+            response = send_file(
+                f,
+                as_attachment=True,
+                download_name=f'{campaign_id}_full_package.bin',
+                etag=f'{package_stat.st_mtime_ns:x}-{file_size:x}',
+                last_modified=package_stat.st_mtime
+            )
+            response.content_length = file_size
+    except Exception:
+        f.close()
+        raise
+    
+    return response
 
 
 @app.route('/packages/<campaign_id>/metadata.json', methods=['GET'])
@@ -554,36 +934,54 @@ def init_mqtt_broker():
         print("[MQTT] Failed to connect to broker")
 
 
+def _read_campaign_metadata(campaign_dir: str) -> Optional[Dict]:
+    """Read and parse campaign_metadata.json (None if missing)"""
+    metadata_path = os.path.join(campaign_dir, 'campaign_metadata.json')
+    try:
+        with open(metadata_path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
 def load_campaigns():
     """Load campaigns from disk"""
     if not os.path.exists(CAMPAIGNS_DIR):
         return
     
-    for campaign_folder in os.listdir(CAMPAIGNS_DIR):
-        if not campaign_folder.startswith('Campaign_'):
-            continue
-        
-        campaign_dir = os.path.join(CAMPAIGNS_DIR, campaign_folder)
-        metadata_path = os.path.join(campaign_dir, 'campaign_metadata.json')
+    # scandir yields name + type in one pass (no per-entry stat)
+    with os.scandir(CAMPAIGNS_DIR) as it:
+        entries = [e for e in it if e.name.startswith('Campaign_') and e.is_dir()]
+    
+    if not entries:
+        return
+    
+    # Metadata reads are I/O bound; overlap them and populate campaigns_db here
+    with ThreadPoolExecutor(max_workers=min(CAMPAIGN_LOAD_WORKERS, len(entries))) as executor:
+        futures = [(entry, executor.submit(_read_campaign_metadata, entry.path))
+                   for entry in entries]
         
-        if os.path.exists(metadata_path):
+        for entry, future in futures:
             try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
+                metadata = future.result()
+                if metadata is None:
+                    continue
                 
                 campaign_id = metadata['campaign_id']
+                CampaignManager.invalidate_metadata_template(campaign_id)
                 campaigns_db[campaign_id] = {
                     'campaign_id': campaign_id,
                     'created_at': metadata.get('created_at', ''),
                     'status': 'ready',
                     'packages': metadata.get('packages', []),
-                    'campaign_dir': campaign_dir,
+                    'campaign_dir': entry.path,
                     'deployment_status': {}
                 }
                 
                 print(f"[Campaign] Loaded: {campaign_id}")
             except Exception as e:
-                print(f"[Campaign] Failed to load {campaign_folder}: {e}")
+                print(f"[Campaign] Failed to load {entry.name}: {e}")
 
 
 if __name__ == '__main__':
@@ -599,12 +997,13 @@ if __name__ == '__main__':
     # Load existing campaigns
     load_campaigns()
     
-    print(f"[Flask] Starting HTTPS server on port 5000...")
+    print(f"[Flask] Starting development server on port 5000...")
     print(f"[Flask] Server URL: {SERVER_URL}")
+    print("[Flask] For production use: gunicorn -c gunicorn.conf.py app:app")
     print()
     
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True
+        debug=os.getenv('FLASK_DEBUG', '') == '1'
     )
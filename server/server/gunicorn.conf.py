@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for the PQC OTA Server
+Usage (from server/server): gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Threaded workers: package downloads are I/O bound and run concurrently.
+# A streaming download occupies one thread for its whole duration, so app.py
+# caps downloads (MAX_CONCURRENT_DOWNLOADS, default GUNICORN_THREADS minus a
+# quarter) below this count and answers the excess with 503; the remaining
+# threads keep serving the API. Change the thread count via GUNICORN_THREADS,
+# not --threads, so app.py derives the cap from the same value.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+
+# Campaign/vehicle state and the MQTT client live in process memory, and the
+# broker allows only one session per client_id ("OEM_OTA_Server"). Keep a
+# single worker unless that state is moved out of process. (Download tokens
+# are signed with DOWNLOAD_TOKEN_SECRET and need no shared state.)
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+
+# Load app.py (and campaigns) once in the master; workers inherit via fork.
+# Threads do not survive fork, so nothing may start a thread at import time
+# or in on_starting: the MQTT client, its dispatch threads and the
+# mqtt_broker log listener are all started inside the worker (post_fork and
+# first log record respectively).
+preload_app = True
+
+# Full downloads go through wsgi.file_wrapper -> sendfile(2) (gunicorn's
+# default). The default 30s worker timeout does not cap download length:
+# gthread workers heartbeat from their main loop every second, independent
+# of the threads streaming responses.
+
+accesslog = '-'
+
+
+def on_starting(server):
+    """Load campaigns in the master before workers are forked (loader threads are joined)"""
+    import app
+    app.load_campaigns()
+
+
+def post_fork(server, worker):
+    """Start the MQTT client in the worker (network threads do not survive fork)"""
+    import app
+    app.init_mqtt_broker()
@@ -5,16 +5,96 @@ Handles communication with VMG (Vehicle Master Gateway)
 
 import paho.mqtt.client as mqtt
 import json
+import itertools
+import socket
 import threading
 import time
+import atexit
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Callable, Optional, List
 import logging
+import logging.handlers
+
+# JSON codec: orjson works on bytes directly (no str round-trip);
+# orjson.JSONDecodeError subclasses json.JSONDecodeError
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+# Records are queued from the MQTT network thread and written to stderr
+# by a background listener, so message callbacks never block on log I/O.
+# The listener thread is started on the first record in each process rather
+# than at import: threads do not survive fork (gunicorn preload_app), and a
+# listener started in the master would leave the worker's queue undrained.
+_log_queue = queue.SimpleQueue()
+_log_listener: Optional[logging.handlers.QueueListener] = None
+_log_listener_started = False
+_log_listener_lock = threading.Lock()
+
+
+def _ensure_log_listener():
+    """Start the queue listener if this process does not have one yet"""
+    global _log_listener, _log_listener_started
+    if _log_listener_started:
+        return
+    with _log_listener_lock:
+        if not _log_listener_started:
+            _log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+            _log_listener.start()
+            _log_listener_started = True
+
+
+def _stop_log_listener():
+    """Flush queued records at exit (only for a listener started in this process)"""
+    if _log_listener_started:
+        _log_listener.stop()
+
+
+def _reset_log_listener():
+    """In a forked child the listener thread is gone and the lock may be held"""
+    global _log_listener, _log_listener_started, _log_listener_lock
+    _log_listener = None
+    _log_listener_started = False
+    _log_listener_lock = threading.Lock()
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that makes sure a listener drains the queue"""
+    
+    def enqueue(self, record):
+        _ensure_log_listener()
+        super().enqueue(record)
+
+
+logging.basicConfig(level=logging.INFO, handlers=[_LazyQueueHandler(_log_queue)])
+atexit.register(_stop_log_listener)
+os.register_at_fork(after_in_child=_reset_log_listener)
+
 logger = logging.getLogger(__name__)
 
+# Kernel socket buffer size requested for the broker connection. Applied after
+# connect, so the kernel may cap it (net.core.wmem_max/rmem_max).
+SOCKET_BUFFER_SIZE = 1 << 20
+
+# Conditions checked by request_ota_readiness
+READINESS_CONDITIONS = (
+    "vehicle_parked",
+    "ignition_off",
+    "battery_soc_gt_50",
+    "network_quality_gt_70",
+    "storage_available_gt_10gb",
+    "no_critical_dtc",
+)
+
 
 class OTAMQTTBroker:
     """
@@ -22,20 +102,69 @@ class OTAMQTTBroker:
     Handles VMG communication following MQTT_API_SPECIFICATION.md
     """
     
-    def __init__(self, broker_host="localhost", broker_port=1883, use_tls=False):
+    # Static parts of outbound payloads (shared, never mutated; per-call
+    # fields are filled into a shallow copy in the original key order)
+    _DEFAULT_SCHEDULE = {
+        "type": "user_consent_required",
+        "conditions": ["vehicle_parked", "battery_level_gt_50", "ignition_off"]
+    }
+    _DEFAULT_ROLLBACK_DATA = {
+        "rollback_enabled": True,
+        "rollback_timeout_sec": 300,
+        "auto_rollback_on_failure": True
+    }
+    _CAMPAIGN_TEMPLATE = {
+        "msg_type": "ota_campaign",
+        "timestamp": None,
+        "campaign_id": None,
+        "campaign_type": "software_update",
+        "priority": "normal",
+        "vehicle": None,
+        "target_ecus": None,
+        "total_size_mb": 0,
+        "schedule": _DEFAULT_SCHEDULE,
+        "rollback_enabled": True,
+        "estimated_duration_minutes": 30,
+        "release_notes_url": ""
+    }
+    _METADATA_TEMPLATE = {
+        "msg_type": "ota_campaign_metadata",
+        "timestamp": None,
+        "campaign_id": None,
+        "download_session": None,
+        "full_package": None,
+        "packages": None,
+        "installation_sequence": [],
+        "rollback_data": _DEFAULT_ROLLBACK_DATA
+    }
+    
+    def __init__(self, broker_host="localhost", broker_port=1883, use_tls=False,
+                 dispatch_workers: int = 4):
         self.broker_host = broker_host
         self.broker_port = broker_port
         self.use_tls = use_tls
         
+        # Inbound decoding/handlers run off paho's network thread. One
+        # single-thread executor per shard keeps each VIN's messages in order.
+        self._dispatchers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"mqtt-dispatch-{i}")
+            for i in range(max(1, dispatch_workers))
+        ]
+        
         # MQTT Client
         self.client = mqtt.Client(client_id="OEM_OTA_Server", protocol=mqtt.MQTTv5)
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect
         
-        # Connected vehicles
+        # Connected vehicles: vin -> {'vin', 'status', 'last_seen_ts' (monotonic,
+        # for online checks), 'last_seen_epoch' (wall clock, for the API)}
         self.connected_vehicles: Dict[str, Dict] = {}
         
+        # Request id sequence, seeded from wall-clock ms so ids stay
+        # increasing across restarts without a clock read per request
+        self._request_seq = itertools.count(time.time_ns() // 1_000_000)
+        
         # Message handlers
         self.handlers = {
             'vehicle_wake_up': [],
@@ -54,6 +183,7 @@ class OTAMQTTBroker:
         
         # Connection status
         self.connected = False
+        self._connected_event = threading.Event()
     
     def connect(self):
         """Connect to MQTT broker"""
@@ -63,15 +193,14 @@ class OTAMQTTBroker:
                 self.client.tls_set()
             
             logger.info(f"Connecting to MQTT broker at {self.broker_host}:{self.broker_port}...")
+            self._connected_event.clear()
             self.client.connect(self.broker_host, self.broker_port, keepalive=60)
             self.client.loop_start()
             
-            # Wait for connection
-            for _ in range(10):
-                if self.connected:
-                    logger.info("Successfully connected to MQTT broker")
-                    return True
-                time.sleep(0.5)
+            # Wait for connection (set by _on_connect)
+            if self._connected_event.wait(timeout=5.0):
+                logger.info("Successfully connected to MQTT broker")
+                return True
             
             logger.error("Failed to connect to MQTT broker")
             return False
@@ -86,13 +215,24 @@ class OTAMQTTBroker:
         self.client.loop_stop()
         self.client.disconnect()
         self.connected = False
+        self._connected_event.clear()
     
     def _on_connect(self, client, userdata, flags, rc, properties=None):
         """Callback when connected to broker"""
         if rc == 0:
             self.connected = True
+            self._connected_event.set()
             logger.info("Connected to MQTT broker")
             
+            # Small QoS 1/2 packets (PUBLISH/PUBACK/PUBREC) should go out
+            # immediately rather than wait on Nagle; larger buffers absorb
+            # metadata fan-out bursts
+            sock = self.client.socket()
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            
             # Subscribe to all OEM topics
             topics = [
                 ("oem/+/wake_up", 1),
@@ -111,34 +251,44 @@ class OTAMQTTBroker:
     def _on_disconnect(self, client, userdata, rc):
         """Callback when disconnected from broker"""
         self.connected = False
+        self._connected_event.clear()
         logger.warning(f"Disconnected from MQTT broker (rc={rc})")
     
     def _on_message(self, client, userdata, msg):
-        """Callback when message received"""
+        """Callback when message received (hands off to the VIN's dispatcher)"""
+        # Parse topic
+        topic_parts = msg.topic.split('/')
+        if len(topic_parts) < 3:
+            logger.warning(f"Invalid topic format: {msg.topic}")
+            return
+        
+        vin = topic_parts[1]  # oem/{vin}/...
+        dispatcher = self._dispatchers[hash(vin) % len(self._dispatchers)]
+        dispatcher.submit(self._dispatch_message, vin, msg.topic, msg.payload)
+    
+    def _dispatch_message(self, vin: str, topic: str, raw_payload: bytes):
+        """Decode a message, update vehicle status and run handlers"""
         try:
-            # Parse topic
-            topic_parts = msg.topic.split('/')
-            if len(topic_parts) < 3:
-                logger.warning(f"Invalid topic format: {msg.topic}")
-                return
-            
-            vin = topic_parts[1]  # oem/{vin}/...
-            
             # Decode payload
-            payload = json.loads(msg.payload.decode('utf-8'))
+            payload = _json_loads(raw_payload)
             msg_type = payload.get('msg_type', 'unknown')
             
-            logger.info(f"[{vin}] Received: {msg_type} on {msg.topic}")
+            logger.info(f"[{vin}] Received: {msg_type} on {topic}")
             
-            # Update vehicle status
-            if vin not in self.connected_vehicles:
+            # Update vehicle status (raw clocks; ISO string formatted on demand)
+            now_ts = time.monotonic()
+            now_epoch = time.time()
+            vehicle = self.connected_vehicles.get(vin)
+            if vehicle is None:
                 self.connected_vehicles[vin] = {
                     'vin': vin,
-                    'last_seen': datetime.now().isoformat(),
+                    'last_seen_ts': now_ts,
+                    'last_seen_epoch': now_epoch,
                     'status': 'online'
                 }
-            
-            self.connected_vehicles[vin]['last_seen'] = datetime.now().isoformat()
+            else:
+                vehicle['last_seen_ts'] = now_ts
+                vehicle['last_seen_epoch'] = now_epoch
             
             # Route to handlers
             if msg_type in self.handlers:
@@ -174,7 +324,7 @@ class OTAMQTTBroker:
             qos: Quality of Service (0, 1, 2)
         """
         topic = f"oem/{vin}/{topic_suffix}"
-        payload_json = json.dumps(payload)
+        payload_json = _json_dumps(payload)
         
         result = self.client.publish(topic, payload_json, qos=qos)
         
@@ -195,7 +345,7 @@ class OTAMQTTBroker:
         payload = {
             "msg_type": "request_vci",
             "timestamp": datetime.now().isoformat(),
-            "request_id": f"vci-req-{int(time.time())}",
+            "request_id": f"vci-req-{next(self._request_seq)}",
             "scope": {
                 "include_vmg": True,
                 "include_zone_gateway": True,
@@ -213,78 +363,67 @@ class OTAMQTTBroker:
         payload = {
             "msg_type": "request_ota_readiness",
             "timestamp": datetime.now().isoformat(),
-            "readiness_check_id": f"ready-check-{int(time.time())}",
+            "readiness_check_id": f"ready-check-{next(self._request_seq)}",
             "target_ecus": target_ecus,
-            "conditions": [
-                "vehicle_parked",
-                "ignition_off",
-                "battery_soc_gt_50",
-                "network_quality_gt_70",
-                "storage_available_gt_10gb",
-                "no_critical_dtc"
-            ]
+            "conditions": READINESS_CONDITIONS
         }
         
         return self.publish(vin, "command", payload, qos=1)
     
     def send_campaign_notification(self, vin: str, campaign_data: Dict):
         """Send OTA campaign notification"""
-        payload = {
-            "msg_type": "ota_campaign",
-            "timestamp": datetime.now().isoformat(),
-            "campaign_id": campaign_data['campaign_id'],
-            "campaign_type": "software_update",
-            "priority": campaign_data.get('priority', 'normal'),
-            "vehicle": {
-                "vin": vin
-            },
-            "target_ecus": campaign_data['target_ecus'],
-            "total_size_mb": campaign_data.get('total_size_mb', 0),
-            "schedule": campaign_data.get('schedule', {
-                "type": "user_consent_required",
-                "conditions": ["vehicle_parked", "battery_level_gt_50", "ignition_off"]
-            }),
-            "rollback_enabled": campaign_data.get('rollback_enabled', True),
-            "estimated_duration_minutes": campaign_data.get('estimated_duration_minutes', 30),
-            "release_notes_url": campaign_data.get('release_notes_url', '')
-        }
+        payload = self._CAMPAIGN_TEMPLATE.copy()
+        payload["timestamp"] = datetime.now().isoformat()
+        payload["campaign_id"] = campaign_data['campaign_id']
+        payload["vehicle"] = {"vin": vin}
+        payload["target_ecus"] = campaign_data['target_ecus']
+        
+        # Optional fields only override the template when present
+        for key in ('priority', 'total_size_mb', 'schedule', 'rollback_enabled',
+                    'estimated_duration_minutes', 'release_notes_url'):
+            if key in campaign_data:
+                payload[key] = campaign_data[key]
         
         return self.publish(vin, "ota/campaign", payload, qos=2)
     
     def send_campaign_metadata(self, vin: str, metadata: Dict):
         """Send OTA campaign metadata with HTTPS download URL"""
-        payload = {
-            "msg_type": "ota_campaign_metadata",
-            "timestamp": datetime.now().isoformat(),
-            "campaign_id": metadata['campaign_id'],
-            "download_session": metadata['download_session'],
-            "full_package": metadata['full_package'],
-            "packages": metadata['packages'],
-            "installation_sequence": metadata.get('installation_sequence', []),
-            "rollback_data": metadata.get('rollback_data', {
-                "rollback_enabled": True,
-                "rollback_timeout_sec": 300,
-                "auto_rollback_on_failure": True
-            })
-        }
+        payload = self._METADATA_TEMPLATE.copy()
+        payload["timestamp"] = datetime.now().isoformat()
+        payload["campaign_id"] = metadata['campaign_id']
+        payload["download_session"] = metadata['download_session']
+        payload["full_package"] = metadata['full_package']
+        payload["packages"] = metadata['packages']
+        if 'installation_sequence' in metadata:
+            payload["installation_sequence"] = metadata['installation_sequence']
+        if 'rollback_data' in metadata:
+            payload["rollback_data"] = metadata['rollback_data']
         
         return self.publish(vin, "ota/metadata", payload, qos=2)
     
     def get_connected_vehicles(self) -> Dict[str, Dict]:
-        """Get list of connected vehicles"""
-        return self.connected_vehicles.copy()
+        """Get list of connected vehicles (with ISO 'last_seen')"""
+        return {
+            vin: {
+                'vin': vin,
+                'last_seen': datetime.fromtimestamp(vehicle['last_seen_epoch']).isoformat(),
+                'status': vehicle['status']
+            }
+            for vin, vehicle in list(self.connected_vehicles.items())
+        }
+    
+    def connected_vehicle_count(self) -> int:
+        """Number of vehicles seen since startup"""
+        return len(self.connected_vehicles)
     
     def is_vehicle_online(self, vin: str) -> bool:
         """Check if vehicle is online"""
-        if vin not in self.connected_vehicles:
+        vehicle = self.connected_vehicles.get(vin)
+        if vehicle is None:
             return False
         
-        vehicle = self.connected_vehicles[vin]
-        last_seen = datetime.fromisoformat(vehicle['last_seen'])
-        elapsed = (datetime.now() - last_seen).total_seconds()
-        
         # Consider offline if not seen for > 5 minutes
-        return elapsed < 300
+        return time.monotonic() - vehicle['last_seen_ts'] < 300
 
 
 # ==================== Example Usage ====================
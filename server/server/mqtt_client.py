@@ -6,18 +6,39 @@ PQC OTA Server - MQTT Broker Integration
 import paho.mqtt.client as mqtt
 import json
 import os
+import socket
 from datetime import datetime
 from typing import Callable, Optional
 
+# JSON 코덱: orjson은 bytes를 직접 처리 (str 변환 없음)
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
+
 # 설정
 MQTT_BROKER_HOST = "localhost"
 MQTT_BROKER_PORT = 8883
 CERT_DIR = os.path.join(os.path.dirname(__file__), '../certs')
 
+# 소켓 송수신 버퍼 크기 (커널 wmem_max/rmem_max로 제한될 수 있음)
+SOCKET_BUFFER_SIZE = 1 << 20
+
 
 class PQCMQTTClient:
     """PQC TLS를 사용하는 MQTT 클라이언트"""
     
+    # 토픽 마지막 세그먼트 (ota/device/{id}/{suffix}) -> 콜백 속성 이름
+    _SUFFIX_CALLBACKS = {
+        'status': 'on_device_status',      # 디바이스 상태
+        'progress': 'on_update_progress',  # 다운로드 진행률
+        'result': 'on_update_result',      # 업데이트 결과
+    }
+    
     def __init__(
         self,
         client_id: str = "ota_server",
@@ -71,6 +92,13 @@ class PQCMQTTClient:
         if rc == 0:
             print("[MQTT] Connection successful")
             
+            # Nagle 비활성화: QoS 1/2 ACK 등 작은 패킷을 지연 없이 전송
+            sock = self.client.socket()
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            
             # 토픽 구독
             self.client.subscribe("ota/device/+/status", qos=1)
             self.client.subscribe("ota/device/+/progress", qos=0)
@@ -87,34 +115,25 @@ class PQCMQTTClient:
     def _on_message(self, client, userdata, msg):
         """메시지 수신 콜백"""
         topic = msg.topic
-        payload = msg.payload.decode('utf-8')
-        
-        print(f"[MQTT] Message: {topic} -> {payload}")
         
         try:
-            data = json.loads(payload)
-            
-            # 디바이스 상태
-            if '/status' in topic:
-                if self.on_device_status:
-                    self.on_device_status(topic, data)
-            
-            # 다운로드 진행률
-            elif '/progress' in topic:
-                if self.on_update_progress:
-                    self.on_update_progress(topic, data)
+            # bytes를 그대로 파싱 (decode 생략)
+            data = _json_loads(msg.payload)
+            print(f"[MQTT] Message: {topic} -> {data}")
             
-            # 업데이트 결과
-            elif '/result' in topic:
-                if self.on_update_result:
-                    self.on_update_result(topic, data)
+            # 토픽 접미사로 콜백 선택 (dict 조회 1회)
+            attr = self._SUFFIX_CALLBACKS.get(topic.rpartition('/')[2])
+            callback = getattr(self, attr) if attr else None
+            if callback:
+                callback(topic, data)
         
-        except json.JSONDecodeError:
-            print(f"[MQTT] Invalid JSON: {payload}")
+        except ValueError:
+            # JSONDecodeError 및 잘못된 UTF-8 (UnicodeDecodeError)
+            print(f"[MQTT] Invalid JSON: {msg.payload.decode('utf-8', 'replace')}")
     
     def publish_update_notification(self, version: str, is_critical: bool = False):
         """업데이트 알림 발행"""
-        payload = json.dumps({
+        payload = _json_dumps({
             'version': version,
             'is_critical': is_critical,
             'timestamp': datetime.now().isoformat()
@@ -125,8 +144,7 @@ class PQCMQTTClient:
     
     def publish_message(self, topic: str, payload: dict, qos: int = 1):
         """메시지 발행"""
-        payload_str = json.dumps(payload)
-        self.client.publish(topic, payload_str, qos=qos)
+        self.client.publish(topic, _json_dumps(payload), qos=qos)
         print(f"[MQTT] Published to {topic}")
 
 
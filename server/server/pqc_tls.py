@@ -5,11 +5,27 @@ C 라이브러리를 ctypes로 호출하는 Python 래퍼
 
 import ctypes
 import os
+import threading
 from typing import Optional
 
 # 라이브러리 경로
 LIB_PATH = os.path.join(os.path.dirname(__file__), 'libpqc_tls.so')
 
+# read()용 스레드별 재사용 버퍼 크기 (TLS 레코드 최대 16 KiB의 배수)
+READ_BUFFER_SIZE = 65536
+
+# C 인자용 인코딩 캐시 (알고리즘 이름, 인증서 경로 등 최초 사용 시 추가)
+_encoded_args = {}
+
+
+def _c_str(value: str) -> bytes:
+    """str -> UTF-8 bytes (같은 문자열은 한 번만 인코딩)"""
+    encoded = _encoded_args.get(value)
+    if encoded is None:
+        encoded = _encoded_args[value] = value.encode('utf-8')
+    return encoded
+
+
 # ctypes 구조체 정의
 class PQCTLSInfo(ctypes.Structure):
     _fields_ = [
@@ -32,6 +48,9 @@ class PQCTLSWrapper:
         
         self._setup_functions()
         
+        # 스레드별 읽기 버퍼 (싱글톤이 여러 스레드에서 공유됨)
+        self._local = threading.local()
+        
     def _setup_functions(self):
         """함수 시그니처 설정"""
         # 초기화
@@ -114,11 +133,11 @@ class PQCTLSWrapper:
     ) -> Optional[int]:
         """서버 컨텍스트 생성"""
         ctx = self.lib.pqc_tls_create_server_ctx(
-            cert_file.encode('utf-8'),
-            key_file.encode('utf-8'),
-            ca_file.encode('utf-8'),
-            kem_algorithm.encode('utf-8'),
-            sig_algorithm.encode('utf-8'),
+            _c_str(cert_file),
+            _c_str(key_file),
+            _c_str(ca_file),
+            _c_str(kem_algorithm),
+            _c_str(sig_algorithm),
             require_client_cert
         )
         return ctx if ctx else None
@@ -133,11 +152,11 @@ class PQCTLSWrapper:
     ) -> Optional[int]:
         """클라이언트 컨텍스트 생성"""
         ctx = self.lib.pqc_tls_create_client_ctx(
-            cert_file.encode('utf-8'),
-            key_file.encode('utf-8'),
-            ca_file.encode('utf-8'),
-            kem_algorithm.encode('utf-8'),
-            sig_algorithm.encode('utf-8')
+            _c_str(cert_file),
+            _c_str(key_file),
+            _c_str(ca_file),
+            _c_str(kem_algorithm),
+            _c_str(sig_algorithm)
         )
         return ctx if ctx else None
     
@@ -156,14 +175,30 @@ class PQCTLSWrapper:
         conn = self.lib.pqc_tls_connect(ctx, socket_fd)
         return conn if conn else None
     
+    def _read_buffer(self) -> ctypes.Array:
+        """현재 스레드의 읽기 버퍼 (최초 1회만 할당)"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = ctypes.create_string_buffer(READ_BUFFER_SIZE)
+        return buffer
+    
     def read(self, conn: int, size: int = 4096) -> Optional[bytes]:
-        """데이터 읽기"""
-        buffer = ctypes.create_string_buffer(size)
-        n = self.lib.pqc_tls_read(conn, buffer, size)
+        """데이터 읽기 (최대 READ_BUFFER_SIZE 바이트)"""
+        buffer = self._read_buffer()
+        n = self.lib.pqc_tls_read(conn, buffer, min(size, READ_BUFFER_SIZE))
         if n > 0:
-            return buffer.raw[:n]
+            # 읽은 n 바이트만 한 번 복사
+            return ctypes.string_at(buffer, n)
         return None
     
+    def read_into(self, conn: int, buf: bytearray) -> int:
+        """호출자 버퍼에 직접 읽기 (추가 복사 없음), 읽은 바이트 수 반환"""
+        size = len(buf)
+        if size == 0:
+            return 0
+        c_buf = (ctypes.c_char * size).from_buffer(buf)
+        return self.lib.pqc_tls_read(conn, c_buf, size)
+    
     def write(self, conn: int, data: bytes) -> int:
         """데이터 쓰기"""
         return self.lib.pqc_tls_write(conn, data, len(data))
@@ -0,0 +1,41 @@
+"""
+Shared fixtures: the server module is imported as `app` from server/server
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import app as ota  # noqa: E402
+
+
+@pytest.fixture
+def package_campaign(tmp_path):
+    """Factory for campaigns with a full_package.bin on disk
+
+    make(campaign_id, data, vin) registers the campaign and returns download
+    auth headers; campaigns and their cached metadata are removed afterwards.
+    """
+    created = []
+
+    def make(campaign_id, data, vin='VIN_TEST'):
+        campaign_dir = tmp_path / campaign_id
+        campaign_dir.mkdir()
+        (campaign_dir / 'full_package.bin').write_bytes(data)
+        ota.campaigns_db[campaign_id] = {
+            'campaign_id': campaign_id,
+            'campaign_dir': str(campaign_dir),
+            'deployment_status': {}
+        }
+        created.append(campaign_id)
+        token = ota.issue_download_token(vin, campaign_id)
+        return {'Authorization': f'Bearer {token}'}
+
+    yield make
+
+    for campaign_id in created:
+        ota.campaigns_db.pop(campaign_id, None)
+        ota.CampaignManager.invalidate_metadata_template(campaign_id)
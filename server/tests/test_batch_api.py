@@ -0,0 +1,51 @@
+"""
+Per-item validation and error isolation for POST /api/batch
+"""
+
+import app as ota
+
+
+def post_batch(items):
+    response = ota.app.test_client().post('/api/batch', json={'requests': items})
+    assert response.status_code == 200
+    return response.get_json()['responses']
+
+
+def test_non_object_item_is_rejected_per_item():
+    responses = post_batch(['x', {'id': '2', 'url': '/api/campaigns'}])
+    assert [r['status'] for r in responses] == [400, 200]
+
+
+def test_non_string_url_is_rejected_per_item():
+    responses = post_batch([{'id': '1', 'url': 5}])
+    assert responses[0]['id'] == '1'
+    assert responses[0]['status'] == 400
+
+
+def test_percent_encoded_batch_url_is_not_nested():
+    inner = {'requests': [{'id': 'inner', 'url': '/api/campaigns'}]}
+    responses = post_batch([
+        {'id': '1', 'url': '/api/%62atch', 'method': 'POST', 'body': inner},
+        {'id': '2', 'url': '/%61pi/batch', 'method': 'POST', 'body': inner},
+    ])
+    assert [r['status'] for r in responses] == [400, 400]
+    assert responses[0]['body'] == {'error': 'Unsupported batch url'}
+
+
+def test_non_api_route_is_rejected():
+    responses = post_batch([{'id': '1', 'url': '/%70ackages/X/metadata.json'}])
+    assert responses[0]['status'] == 400
+
+
+def test_failing_item_does_not_sink_the_batch(monkeypatch):
+    def failing_get_vehicle(vin):
+        raise RuntimeError('boom')
+
+    monkeypatch.setitem(ota.app.view_functions, 'get_vehicle', failing_get_vehicle)
+    responses = post_batch([
+        {'id': '1', 'url': '/api/vehicles/VIN_BATCH_TEST'},
+        {'id': '2', 'url': '/api/campaigns'},
+    ])
+    assert [r['status'] for r in responses] == [500, 200]
+    assert responses[0]['body'] == {'error': 'Internal error: RuntimeError'}
+    assert 'campaigns' in responses[1]['body']
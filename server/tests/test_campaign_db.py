@@ -0,0 +1,50 @@
+"""
+campaigns_db creation and list snapshots
+"""
+
+import threading
+
+import app as ota
+
+
+def test_concurrent_creates_of_one_id_have_one_winner():
+    campaign_id = 'DB-TEST-RACE'
+    results = []
+    barrier = threading.Barrier(8)
+
+    def create():
+        barrier.wait()
+        results.append(ota.CampaignManager.create_campaign(campaign_id, {}))
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        winners = [r for r in results if r is not None]
+        assert len(winners) == 1
+        assert ota.campaigns_db[campaign_id] is winners[0]
+    finally:
+        ota.campaigns_db.pop(campaign_id, None)
+
+
+def test_duplicate_create_returns_409():
+    client = ota.app.test_client()
+    try:
+        assert client.post('/api/campaigns', json={'campaign_id': 'DB-TEST-DUP'}).status_code == 201
+        assert client.post('/api/campaigns', json={'campaign_id': 'DB-TEST-DUP'}).status_code == 409
+    finally:
+        ota.campaigns_db.pop('DB-TEST-DUP', None)
+
+
+def test_list_snapshot_is_a_copy():
+    ota.vehicles_db['VIN_DB_TEST'] = {'vin': 'VIN_DB_TEST', 'status': 'online'}
+    try:
+        snapshot = ota.snapshot_records(ota.vehicles_db)
+        record = next(r for r in snapshot if r['vin'] == 'VIN_DB_TEST')
+        record['status'] = 'changed'
+        assert ota.vehicles_db['VIN_DB_TEST']['status'] == 'online'
+    finally:
+        ota.vehicles_db.pop('VIN_DB_TEST', None)
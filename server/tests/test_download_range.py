@@ -0,0 +1,58 @@
+"""
+Range header handling for /packages/<campaign_id>/full_package.bin
+"""
+
+import pytest
+
+import app as ota
+
+CAMPAIGN_ID = 'RANGE-TEST'
+PACKAGE = bytes(range(100))
+
+
+@pytest.fixture
+def get_range(package_campaign):
+    """GET the test package with a raw Range header value"""
+    headers = package_campaign(CAMPAIGN_ID, PACKAGE, vin='VIN_RANGE_TEST')
+    client = ota.app.test_client()
+
+    def get(range_value):
+        response = client.get(
+            f'/packages/{CAMPAIGN_ID}/full_package.bin',
+            headers=headers,
+            environ_overrides={'HTTP_RANGE': range_value}
+        )
+        body = response.data
+        response.close()
+        return response, body
+
+    return get
+
+
+@pytest.mark.parametrize('range_value, expected', [
+    ('bytes=0-9', PACKAGE[0:10]),
+    ('bytes=90-', PACKAGE[90:]),
+    ('bytes=-10', PACKAGE[90:]),
+    ('bytes=95-500', PACKAGE[95:]),
+])
+def test_satisfiable_range(get_range, range_value, expected):
+    response, body = get_range(range_value)
+    assert response.status_code == 206
+    assert body == expected
+
+
+def test_trailing_newline_is_rejected(get_range):
+    response, _ = get_range('bytes=0-9\n')
+    assert response.status_code == 400
+
+
+def test_last_before_first_is_ignored(get_range):
+    response, body = get_range('bytes=9-3')
+    assert response.status_code == 200
+    assert body == PACKAGE
+
+
+def test_start_past_end_is_unsatisfiable(get_range):
+    response, _ = get_range('bytes=200-')
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(PACKAGE)}'
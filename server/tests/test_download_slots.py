@@ -0,0 +1,78 @@
+"""
+Download slot accounting for /packages/<campaign_id>/full_package.bin
+Drives app.wsgi_app directly, the way a WSGI server does (iterate + close)
+"""
+
+import os
+
+import pytest
+from werkzeug.test import EnvironBuilder
+
+import app as ota
+
+CAMPAIGN_ID = 'SLOT-TEST'
+PACKAGE_SIZE = 200 * 1024
+
+
+@pytest.fixture
+def auth_headers(package_campaign):
+    return package_campaign(CAMPAIGN_ID, os.urandom(PACKAGE_SIZE), vin='VIN_SLOT_TEST')
+
+
+def download(headers, consume=True):
+    """Run one download through the WSGI app; returns (status, body length)"""
+    environ = EnvironBuilder(
+        path=f'/packages/{CAMPAIGN_ID}/full_package.bin', headers=headers
+    ).get_environ()
+    status = []
+    app_iter = ota.app.wsgi_app(environ, lambda s, h, exc_info=None: status.append(s))
+    received = 0
+    try:
+        if consume:
+            for chunk in app_iter:
+                received += len(chunk)
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+    return status[0], received
+
+
+def assert_all_slots_free():
+    """Every slot can be taken again, i.e. none leaked"""
+    acquired = 0
+    while ota.download_slots.acquire(blocking=False):
+        acquired += 1
+    for _ in range(acquired):
+        ota.download_slots.release()
+    assert acquired == ota.MAX_CONCURRENT_DOWNLOADS
+
+
+def test_full_downloads_release_slots(auth_headers):
+    for _ in range(ota.MAX_CONCURRENT_DOWNLOADS + 5):
+        status, received = download(auth_headers)
+        assert status.startswith('200')
+        assert received == PACKAGE_SIZE
+    assert_all_slots_free()
+
+
+def test_range_downloads_release_slots(auth_headers):
+    headers = {**auth_headers, 'Range': 'bytes=100-1123'}
+    for _ in range(ota.MAX_CONCURRENT_DOWNLOADS + 5):
+        status, received = download(headers)
+        assert status.startswith('206')
+        assert received == 1024
+    assert_all_slots_free()
+
+
+def test_aborted_downloads_release_slots(auth_headers):
+    ranged = {**auth_headers, 'Range': 'bytes=0-'}
+    for i in range(ota.MAX_CONCURRENT_DOWNLOADS + 5):
+        status, _ = download(ranged if i % 2 else auth_headers, consume=False)
+        assert not status.startswith('503')
+    assert_all_slots_free()
+
+
+def test_default_slots_leave_threads_for_the_api():
+    if 'MAX_CONCURRENT_DOWNLOADS' in os.environ:
+        pytest.skip('MAX_CONCURRENT_DOWNLOADS set explicitly')
+    assert 1 <= ota.MAX_CONCURRENT_DOWNLOADS < ota.GUNICORN_THREADS
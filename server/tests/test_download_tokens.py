@@ -0,0 +1,51 @@
+"""
+Signed download tokens for /packages/<campaign_id>/full_package.bin
+"""
+
+import app as ota
+
+VIN = 'VIN_TOKEN_TEST'
+CAMPAIGN_ID = 'TOKEN-TEST'
+
+
+def test_valid_token_yields_its_vin():
+    token = ota.issue_download_token(VIN, CAMPAIGN_ID)
+    assert ota.validate_download_token(token, CAMPAIGN_ID) == VIN
+
+
+def test_unknown_token_is_rejected():
+    assert ota.validate_download_token('not-a-token', CAMPAIGN_ID) is None
+    assert ota.validate_download_token(f'{VIN}.9999999999.{"0" * 64}', CAMPAIGN_ID) is None
+
+
+def test_token_for_another_campaign_is_rejected():
+    token = ota.issue_download_token(VIN, 'OTHER-CAMPAIGN')
+    assert ota.validate_download_token(token, CAMPAIGN_ID) is None
+
+
+def test_token_with_swapped_vin_is_rejected():
+    _, expiry, mac = ota.issue_download_token(VIN, CAMPAIGN_ID).rsplit('.', 2)
+    assert ota.validate_download_token(f'VIN_OTHER.{expiry}.{mac}', CAMPAIGN_ID) is None
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    token = ota.issue_download_token(VIN, CAMPAIGN_ID)
+    now = ota.time.time()
+    monkeypatch.setattr(ota.time, 'time', lambda: now + ota.DOWNLOAD_TOKEN_TTL_SEC + 1)
+    assert ota.validate_download_token(token, CAMPAIGN_ID) is None
+
+
+def test_download_checks_token_and_vehicle_id():
+    client = ota.app.test_client()
+    url = f'/packages/{CAMPAIGN_ID}/full_package.bin'
+    token = ota.issue_download_token(VIN, CAMPAIGN_ID)
+
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers={'Authorization': 'Bearer bogus'}).status_code == 401
+    assert client.get(url, headers={
+        'Authorization': f'Bearer {token}', 'X-Vehicle-Id': 'VIN_OTHER'
+    }).status_code == 401
+    # Accepted token, campaign unknown to this test app
+    assert client.get(url, headers={
+        'Authorization': f'Bearer {token}', 'X-Vehicle-Id': VIN
+    }).status_code == 404
@@ -0,0 +1,41 @@
+"""
+USE_XACCEL: package downloads handed to the reverse proxy via X-Accel-Redirect
+"""
+
+import pytest
+
+import app as ota
+
+CAMPAIGN_ID = 'XACCEL-TEST'
+
+
+@pytest.fixture
+def xaccel_headers(package_campaign, tmp_path, monkeypatch):
+    monkeypatch.setattr(ota, 'USE_XACCEL', True)
+    monkeypatch.setattr(ota, 'CAMPAIGNS_DIR', str(tmp_path))
+    return package_campaign(CAMPAIGN_ID, b'x' * 1000)
+
+
+@pytest.mark.parametrize('extra_headers', [{}, {'Range': 'bytes=100-199'}])
+def test_proxy_serves_the_package(xaccel_headers, extra_headers):
+    response = ota.app.test_client().get(
+        f'/packages/{CAMPAIGN_ID}/full_package.bin',
+        headers={**xaccel_headers, **extra_headers}
+    )
+
+    # nginx sends the bytes (and handles Range) from the internal location
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == (
+        f'{ota.XACCEL_PREFIX}/{CAMPAIGN_ID}/full_package.bin'
+    )
+    assert response.headers['Content-Type'] == 'application/octet-stream'
+    assert response.headers['Content-Disposition'] == (
+        f'attachment; filename={CAMPAIGN_ID}_full_package.bin'
+    )
+
+
+def test_proxy_path_still_requires_a_token(xaccel_headers):
+    response = ota.app.test_client().get(f'/packages/{CAMPAIGN_ID}/full_package.bin')
+    assert response.status_code == 401
+    assert 'X-Accel-Redirect' not in response.headers
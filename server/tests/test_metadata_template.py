@@ -0,0 +1,109 @@
+"""
+Cached deployment metadata (CampaignManager.get_metadata_template)
+"""
+
+import os
+
+import app as ota
+
+CAMPAIGN_ID = 'META-TEST'
+
+
+def get_template():
+    return ota.CampaignManager.get_metadata_template(CAMPAIGN_ID, ota.campaigns_db[CAMPAIGN_ID])
+
+
+def package_path():
+    return os.path.join(ota.campaigns_db[CAMPAIGN_ID]['campaign_dir'], 'full_package.bin')
+
+
+def test_template_is_reused_while_the_package_is_unchanged(package_campaign):
+    package_campaign(CAMPAIGN_ID, b'a' * 100)
+    first = get_template()
+
+    assert get_template() is first
+    digests, size = ota.calculate_package_hashes(package_path())
+    assert first['full_package']['total_size_bytes'] == size == 100
+    for field, digest in digests.items():
+        assert first['full_package'][field] == digest
+
+
+def test_size_change_rebuilds_the_template(package_campaign):
+    package_campaign(CAMPAIGN_ID, b'a' * 100)
+    first = get_template()
+
+    with open(package_path(), 'ab') as f:
+        f.write(b'b' * 50)
+
+    rebuilt = get_template()
+    assert rebuilt is not first
+    assert rebuilt['full_package']['total_size_bytes'] == 150
+
+
+def test_mtime_change_rebuilds_the_template(package_campaign):
+    package_campaign(CAMPAIGN_ID, b'a' * 100)
+    first = get_template()
+
+    # Same size, new content and a later mtime
+    path = package_path()
+    with open(path, 'wb') as f:
+        f.write(b'c' * 100)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    rebuilt = get_template()
+    assert rebuilt is not first
+    digests, _ = ota.calculate_package_hashes(path)
+    for field, digest in digests.items():
+        assert rebuilt['full_package'][field] == digest
+
+
+def test_invalidate_drops_the_cached_template(package_campaign):
+    package_campaign(CAMPAIGN_ID, b'a' * 100)
+    first = get_template()
+
+    ota.CampaignManager.invalidate_metadata_template(CAMPAIGN_ID)
+    assert get_template() is not first
+
+
+def test_missing_package_uses_placeholders(package_campaign):
+    package_campaign(CAMPAIGN_ID, b'a' * 100)
+    os.remove(package_path())
+    ota.campaigns_db[CAMPAIGN_ID]['total_size_mb'] = 2
+
+    template = get_template()
+    assert template['full_package']['total_size_bytes'] == 2 * 1024 * 1024
+    for field in ota.PACKAGE_DIGEST_FIELDS[ota.HASH_ALGO]:
+        assert template['full_package'][field] == 'unknown'
+
+
+class RecordingBroker:
+    """Stands in for OTAMQTTBroker; records send_campaign_metadata calls"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_campaign_metadata(self, vin, metadata):
+        self.sent.append((vin, metadata))
+
+
+def test_each_vehicle_gets_its_own_session_on_the_shared_template(package_campaign, monkeypatch):
+    package_campaign(CAMPAIGN_ID, b'a' * 100)
+    broker = RecordingBroker()
+    monkeypatch.setattr(ota, 'mqtt_broker', broker)
+
+    assert ota.send_campaign_metadata_to_vehicle(CAMPAIGN_ID, 'VIN_A')
+    assert ota.send_campaign_metadata_to_vehicle(CAMPAIGN_ID, 'VIN_B')
+    (_, meta_a), (_, meta_b) = broker.sent
+    session_a, session_b = meta_a['download_session'], meta_b['download_session']
+
+    assert session_a['session_id'] != session_b['session_id']
+    assert ota.validate_download_token(session_a['authentication']['token'], CAMPAIGN_ID) == 'VIN_A'
+    assert ota.validate_download_token(session_b['authentication']['token'], CAMPAIGN_ID) == 'VIN_B'
+
+    # Per-vehicle fields never leak into the shared template
+    template = get_template()
+    assert template['download_session']['session_id'] is None
+    assert template['download_session']['authentication']['token'] is None
+    assert meta_a['full_package'] is template['full_package']
+    assert list(meta_a) == list(template)
@@ -0,0 +1,101 @@
+"""
+Outbound campaign payloads built from OTAMQTTBroker's class-level templates
+"""
+
+import pytest
+
+from mqtt_broker import OTAMQTTBroker
+
+CAMPAIGN_KEYS = [
+    'msg_type', 'timestamp', 'campaign_id', 'campaign_type', 'priority', 'vehicle',
+    'target_ecus', 'total_size_mb', 'schedule', 'rollback_enabled',
+    'estimated_duration_minutes', 'release_notes_url',
+]
+METADATA_KEYS = [
+    'msg_type', 'timestamp', 'campaign_id', 'download_session', 'full_package',
+    'packages', 'installation_sequence', 'rollback_data',
+]
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """Broker whose publish() records (vin, topic_suffix, payload, qos)"""
+    broker = OTAMQTTBroker()
+    sent = []
+    monkeypatch.setattr(broker, 'publish', lambda vin, suffix, payload, qos=1:
+                        sent.append((vin, suffix, payload, qos)))
+    yield broker, sent
+    for dispatcher in broker._dispatchers:
+        dispatcher.shutdown()
+
+
+def test_campaign_notification_defaults(published):
+    broker, sent = published
+    broker.send_campaign_notification('VIN_1', {'campaign_id': 'C1', 'target_ecus': ['VMG']})
+
+    vin, suffix, payload, qos = sent[0]
+    assert (vin, suffix, qos) == ('VIN_1', 'ota/campaign', 2)
+    assert list(payload) == CAMPAIGN_KEYS
+    assert payload['campaign_id'] == 'C1'
+    assert payload['vehicle'] == {'vin': 'VIN_1'}
+    assert payload['target_ecus'] == ['VMG']
+    assert payload['priority'] == 'normal'
+    assert payload['total_size_mb'] == 0
+    assert payload['schedule']['type'] == 'user_consent_required'
+    assert payload['rollback_enabled'] is True
+    assert payload['estimated_duration_minutes'] == 30
+    assert payload['release_notes_url'] == ''
+
+
+def test_campaign_notification_optional_fields_override_the_template(published):
+    broker, sent = published
+    schedule = {'type': 'immediate', 'conditions': []}
+    broker.send_campaign_notification('VIN_1', {
+        'campaign_id': 'C1',
+        'target_ecus': ['VMG'],
+        'priority': 'critical',
+        'total_size_mb': 12,
+        'schedule': schedule,
+        'rollback_enabled': False,
+        'estimated_duration_minutes': 5,
+        'release_notes_url': 'https://example.com/notes',
+    })
+
+    payload = sent[0][2]
+    assert list(payload) == CAMPAIGN_KEYS
+    assert payload['priority'] == 'critical'
+    assert payload['total_size_mb'] == 12
+    assert payload['schedule'] is schedule
+    assert payload['rollback_enabled'] is False
+    assert payload['estimated_duration_minutes'] == 5
+    assert payload['release_notes_url'] == 'https://example.com/notes'
+
+    # The shared template is never mutated
+    assert OTAMQTTBroker._CAMPAIGN_TEMPLATE['priority'] == 'normal'
+    assert OTAMQTTBroker._CAMPAIGN_TEMPLATE['vehicle'] is None
+
+
+def test_campaign_metadata_defaults_and_overrides(published):
+    broker, sent = published
+    base = {
+        'campaign_id': 'C1',
+        'download_session': {'session_id': 's'},
+        'full_package': {'package_id': 'p'},
+        'packages': [],
+    }
+    broker.send_campaign_metadata('VIN_1', base)
+    rollback = {'rollback_enabled': False}
+    broker.send_campaign_metadata('VIN_1', {
+        **base, 'installation_sequence': ['pkg-vmg'], 'rollback_data': rollback
+    })
+
+    (_, suffix, defaults, qos), (_, _, overridden, _) = sent
+    assert (suffix, qos) == ('ota/metadata', 2)
+    assert list(defaults) == METADATA_KEYS
+    assert defaults['installation_sequence'] == []
+    assert defaults['rollback_data']['auto_rollback_on_failure'] is True
+
+    assert list(overridden) == METADATA_KEYS
+    assert overridden['installation_sequence'] == ['pkg-vmg']
+    assert overridden['rollback_data'] is rollback
+    assert OTAMQTTBroker._METADATA_TEMPLATE['campaign_id'] is None
@@ -10,6 +10,7 @@ import struct
 import zlib
 import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Tuple
 
@@ -36,6 +37,34 @@ SOFTWARE_TYPES = {
     "CFG":  0x04,
 }
 
+HEADER_SIZE = 64
+
+# Precompiled header layout (little-endian, no padding)
+HEADER_STRUCT = struct.Struct(
+    '<I H B B I I '     # Identification (16 bytes)
+    'B B B B I I '      # Version (12 bytes)
+    'I I I I '          # Security (16 bytes)
+    'H H I '            # Routing (8 bytes)
+    '12s'               # Reserved (12 bytes)
+)
+assert HEADER_STRUCT.size == HEADER_SIZE
+
+# Firmware is streamed through compression/CRC/write in chunks of this size
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """SHA256 hex digest of a file, read in chunks"""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        
+        hasher = hashlib.sha256()
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+
 class SoftwarePackageHeader:
     """64-byte Software Package Header"""
     
@@ -70,13 +99,7 @@ class SoftwarePackageHeader:
     
     def pack(self):
         """Pack header to 64-byte binary"""
-        data = struct.pack(
-            '<I H B B I I '     # Identification (16 bytes)
-            'B B B B I I '      # Version (12 bytes)
-            'I I I I '          # Security (16 bytes)
-            'H H I '            # Routing (8 bytes)
-            '12s',              # Reserved (12 bytes)
-            
+        data = HEADER_STRUCT.pack(
             self.magic,
             self.target_ecu_id,
             self.software_type,
@@ -111,7 +134,7 @@ class SoftwarePackageHeader:
         """Unpack 64-byte binary to header"""
         assert len(data) == 64, "Header must be 64 bytes"
         
-        values = struct.unpack('<I H B B I I B B B B I I I I I I H H I 12s', data)
+        values = HEADER_STRUCT.unpack(data)
         
         header = SoftwarePackageHeader()
         header.magic = values[0]
@@ -160,7 +183,7 @@ class PackageBuilder:
         
         os.makedirs(output_dir, exist_ok=True)
     
-    def build_package(self, ecu_name, binary_path, version, compress=False):
+    def build_package(self, ecu_name, binary_path, version, compress=False, log=print):
         """
         Build a single ECU package with header
         
@@ -169,33 +192,22 @@ class PackageBuilder:
             binary_path: Path to raw binary file
             version: (major, minor, patch, build) tuple
             compress: Enable gzip compression
+            log: Callable receiving each progress line (default: print)
         
         Returns:
             Package metadata dictionary
         """
-        print(f"\n=== Building package for {ecu_name} ===")
-        
-        # Read raw binary
-        with open(binary_path, 'rb') as f:
-            payload = f.read()
+        log(f"\n=== Building package for {ecu_name} ===")
         
-        print(f"Raw binary size: {len(payload)} bytes ({len(payload)/1024:.2f} KB)")
+        uncompressed_size = os.path.getsize(binary_path)
+        log(f"Raw binary size: {uncompressed_size} bytes ({uncompressed_size/1024:.2f} KB)")
         
-        # Compress if requested
-        uncompressed_size = len(payload)
-        if compress:
-            payload = zlib.compress(payload, level=9)
-            print(f"Compressed size: {len(payload)} bytes ({len(payload)/1024:.2f} KB)")
-            print(f"Compression ratio: {100 * (1 - len(payload)/uncompressed_size):.1f}%")
-        
-        # Calculate CRC32
-        crc32 = zlib.crc32(payload) & 0xFFFFFFFF
-        print(f"CRC32: 0x{crc32:08X}")
+        package_filename = f"{ecu_name.lower()}_sw_package.bin"
+        package_path = os.path.join(self.output_dir, package_filename)
         
-        # Build header
+        # Build header (payload size and CRC32 are filled in after streaming)
         header = SoftwarePackageHeader()
         header.target_ecu_id = ECU_IDS[ecu_name]
-        header.payload_size = len(payload)
         header.uncompressed_size = uncompressed_size
         header.compression = 1 if compress else 0
         
@@ -206,26 +218,53 @@ class PackageBuilder:
         header.version_timestamp = int(datetime.now().timestamp())
         header.version_serial = int(datetime.now().strftime("%Y%m%d%H%M"))
         
-        header.crc32 = crc32
-        
-        # Pack header
-        header_bytes = header.pack()
-        
-        # Combine header + payload
-        package = header_bytes + payload
+        # Stream binary -> (compress) -> package file, tracking CRC32 and size.
+        # The header depends on both, so reserve its space and write it last.
+        compressor = zlib.compressobj(level=9) if compress else None
+        crc32 = 0
+        payload_size = 0
+        
+        try:
+            with open(binary_path, 'rb') as src, open(package_path, 'wb') as dst:
+                dst.write(bytes(HEADER_SIZE))
+                
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    if compressor:
+                        chunk = compressor.compress(chunk)
+                    crc32 = zlib.crc32(chunk, crc32)
+                    payload_size += len(chunk)
+                    dst.write(chunk)
+                
+                if compressor:
+                    chunk = compressor.flush()
+                    crc32 = zlib.crc32(chunk, crc32)
+                    payload_size += len(chunk)
+                    dst.write(chunk)
+                
+                crc32 &= 0xFFFFFFFF
+                header.payload_size = payload_size
+                header.crc32 = crc32
+                
+                dst.seek(0)
+                dst.write(header.pack())
+        except BaseException:
+            # Don't leave a package with a blank header behind
+            if os.path.exists(package_path):
+                os.remove(package_path)
+            raise
         
-        # Write package
-        package_filename = f"{ecu_name.lower()}_sw_package.bin"
-        package_path = os.path.join(self.output_dir, package_filename)
+        if compress:
+            log(f"Compressed size: {payload_size} bytes ({payload_size/1024:.2f} KB)")
+            log(f"Compression ratio: {100 * (1 - payload_size/uncompressed_size):.1f}%")
         
-        with open(package_path, 'wb') as f:
-            f.write(package)
+        log(f"CRC32: 0x{crc32:08X}")
         
-        print(f"Package created: {package_path}")
-        print(f"Total size: {len(package)} bytes ({len(package)/1024:.2f} KB)")
+        package_size = HEADER_SIZE + payload_size
+        log(f"Package created: {package_path}")
+        log(f"Total size: {package_size} bytes ({package_size/1024:.2f} KB)")
         
         # Calculate SHA256 for metadata
-        sha256 = hashlib.sha256(package).hexdigest()
+        sha256 = file_sha256(package_path)
         
         return {
             "package_id": f"pkg-{ecu_name.lower()}-{version[0]}.{version[1]}.{version[2]}",
@@ -234,9 +273,9 @@ class PackageBuilder:
             "version": f"{version[0]}.{version[1]}.{version[2]}-{version[3]}",
             "file_path": package_path,
             "file_name": package_filename,
-            "size_bytes": len(package),
-            "payload_size_bytes": len(payload),
-            "header_size_bytes": 64,
+            "size_bytes": package_size,
+            "payload_size_bytes": payload_size,
+            "header_size_bytes": HEADER_SIZE,
             "compression": "gzip" if compress else "none",
             "crc32": f"0x{crc32:08X}",
             "sha256": sha256,
@@ -265,36 +304,46 @@ class PackageBuilder:
             "packages": []
         }
         
-        # Build VMG package
+        # Collect (builder, ecu_name) jobs: VMG package first, then zone packages
+        jobs = []
+        
         if "VMG" in packages_config:
             vmg_dir = os.path.join(campaign_dir, "vmg_package")
             os.makedirs(vmg_dir, exist_ok=True)
             
             builder = PackageBuilder(self.campaign_id, vmg_dir, None)
-            vmg_pkg = builder.build_package(
-                "VMG",
-                packages_config["VMG"]["binary"],
-                packages_config["VMG"]["version"],
-                compress=packages_config["VMG"].get("compress", False)
-            )
-            metadata["packages"].append(vmg_pkg)
+            jobs.append((builder, "VMG"))
         
-        # Build Zone packages
         zone_ecus = [k for k in packages_config.keys() if k != "VMG"]
         if zone_ecus:
             zone_dir = os.path.join(campaign_dir, "zone1_package")
             os.makedirs(zone_dir, exist_ok=True)
             
             builder = PackageBuilder(self.campaign_id, zone_dir, None)
-            
-            for ecu_name in zone_ecus:
-                pkg = builder.build_package(
-                    ecu_name,
-                    packages_config[ecu_name]["binary"],
-                    packages_config[ecu_name]["version"],
-                    compress=packages_config[ecu_name].get("compress", False)
-                )
-                metadata["packages"].append(pkg)
+            jobs.extend((builder, ecu_name) for ecu_name in zone_ecus)
+        
+        def build(job):
+            builder, ecu_name = job
+            lines = []
+            package = builder.build_package(
+                ecu_name,
+                packages_config[ecu_name]["binary"],
+                packages_config[ecu_name]["version"],
+                compress=packages_config[ecu_name].get("compress", False),
+                log=lines.append
+            )
+            return package, lines
+        
+        # Packages are independent; zlib and file I/O release the GIL,
+        # so threads build them in parallel. map() keeps metadata order, and
+        # each package's progress lines are printed here as one block so
+        # parallel builds don't interleave their output.
+        if jobs:
+            max_workers = min(len(jobs), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for package, lines in executor.map(build, jobs):
+                    print("\n".join(lines))
+                    metadata["packages"].append(package)
         
         # Write campaign metadata
         metadata_path = os.path.join(campaign_dir, "campaign_metadata.json")